@@ -1,27 +1,40 @@
+import io
 import os
 import sys
-import queue
 import json
 import threading
 import zipfile
 import urllib.request
-import shutil
 import tkinter as tk
 from tkinter import font, colorchooser, ttk
+from collections import deque
 from typing import List, Optional, Callable, Dict, Any, Tuple
 
 import sounddevice as sd
 import vosk
 import numpy as np
 
+try:
+    # Optional C-accelerated parser for the twice-per-block result decode.
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # --- Configuration & Constants ---
 MODEL_VERSION = "vosk-model-small-en-us-0.15"
 MODEL_URL = f"https://alphacephei.com/vosk/models/{MODEL_VERSION}.zip"
 MODEL_PATH = "model"
 SAMPLE_RATE = 16000
-BLOCK_SIZE = 8000
+# 125 ms blocks: partials reach the UI 4x sooner than the old 8000-frame
+# (500 ms) blocks, and Vosk's per-sample cost is unchanged.
+BLOCK_SIZE = 2000
 MAX_HISTORY = 10
 
+# Lazily-filled cache of font.families(): querying the Tcl font server can
+# return hundreds of names and is noticeably slow on font-heavy systems.
+_FONT_FAMILIES_CACHE: Optional[Tuple[str, ...]] = None
+
 # --- Helper Classes ---
 
 class AudioTranscriber:
@@ -33,39 +46,85 @@ class AudioTranscriber:
         self.model_path = model_path
         self.on_text_callback = on_text_callback
         self.running = False
-        self.audio_queue: queue.Queue = queue.Queue()
         self.thread: Optional[threading.Thread] = None
 
-    def _download_model(self) -> None:
-        """Downloads and extracts the Vosk model if missing."""
+    def _download_model(self, progress: Optional[Callable[[str], None]] = None) -> None:
+        """Downloads and extracts the Vosk model if missing.
+
+        `progress` receives human-readable status lines, so the first run
+        shows download progress in the captions instead of a blank window.
+        """
+        def report(msg: str) -> None:
+            print(msg, file=sys.stderr)
+            if progress:
+                progress(msg)
+
         if not os.path.exists(self.model_path):
-            print(f"Model not found. Downloading {MODEL_VERSION}...", file=sys.stderr)
+            report(f"Model not found. Downloading {MODEL_VERSION}...")
             try:
-                file_name = f"{MODEL_VERSION}.zip"
-                with urllib.request.urlopen(MODEL_URL) as response, open(file_name, 'wb') as out_file:
-                    shutil.copyfileobj(response, out_file)
-                
-                print("Extracting model...", file=sys.stderr)
-                with zipfile.ZipFile(file_name, 'r') as zip_ref:
+                # Preallocate the full archive from Content-Length and fill
+                # it with 1 MB reads: a few dozen syscalls instead of
+                # thousands of 16 KB buffered copies, no reallocations, and
+                # real progress output instead of an apparent hang.
+                with urllib.request.urlopen(MODEL_URL) as response:
+                    total = int(response.getheader('Content-Length') or 0)
+                    if total:
+                        buf = bytearray(total)
+                        off = 0
+                        last_pct = -1
+                        with memoryview(buf) as view:
+                            while off < total:
+                                n = response.readinto(view[off:off + (1 << 20)])
+                                if not n:
+                                    break
+                                off += n
+                                pct = off * 100 // total
+                                if pct != last_pct:
+                                    last_pct = pct
+                                    report(f"Downloading model: {pct}%")
+                        if off < total:
+                            raise IOError(f"Short read: {off}/{total} bytes")
+                    else:
+                        buf = bytearray(response.read())
+
+                report("Extracting model...")
+                with zipfile.ZipFile(io.BytesIO(buf)) as zip_ref:
                     zip_ref.extractall(".")
-                
+
                 os.rename(MODEL_VERSION, self.model_path)
-                os.remove(file_name)
-                print("Model downloaded and extracted.", file=sys.stderr)
+                report("Model downloaded and extracted.")
             except Exception as e:
                 print(f"Error downloading model: {e}", file=sys.stderr)
                 # In a real app, might want to signal error to UI
                 sys.exit(1)
 
-    def _audio_callback(self, indata, frames, time, status):
-        """Callback for sounddevice input stream."""
-        if status:
-            print(status, file=sys.stderr)
-        self.audio_queue.put(bytes(indata))
+    def _prefetch_model(self) -> None:
+        """Hints the OS to page in the model files before Vosk maps them.
+
+        Model load dominates cold start; with the FST/nnet files already in
+        the page cache the recognizer constructor stalls far less.
+        """
+        for dirpath, _dirnames, filenames in os.walk(self.model_path):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        if hasattr(os, 'posix_fadvise'):
+                            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                        else:
+                            # No fadvise (e.g. Windows): touching the head of
+                            # each file still warms the cache for small files.
+                            os.read(fd, 4096)
+                    finally:
+                        os.close(fd)
+                except OSError:
+                    continue
 
     def _recognition_loop(self) -> None:
         """Main recognition loop running in a separate thread."""
-        self._download_model()
+        self._download_model(progress=lambda msg: self.on_text_callback(msg, True))
+        self._prefetch_model()
 
         try:
             model = vosk.Model(self.model_path)
@@ -76,25 +135,56 @@ class AudioTranscriber:
 
         rec = vosk.KaldiRecognizer(model, SAMPLE_RATE)
 
+        # Keep result payloads minimal: no word timings in finals or
+        # partials, so there is less for Vosk to serialize and us to parse.
+        try:
+            rec.SetWords(False)
+            rec.SetPartialWords(False)
+        except AttributeError:
+            pass # Older vosk builds lack these setters
+
+        # One receive buffer reused for every block. Vosk's cffi binding
+        # rejects bytearray/memoryview but takes a cdata view, which shares
+        # the bytearray's memory -- so after the initial allocation no bytes
+        # object is created per block. AcceptWaveform copies internally, so
+        # refilling the buffer next iteration is safe. A blocking read always
+        # returns full blocks, so the view's length is always valid.
+        rec_buf = bytearray(BLOCK_SIZE * 2)
+        rec_data = vosk._ffi.from_buffer(rec_buf)
+
         try:
+            # Blocking read path: stream.read() waits inside PortAudio C code
+            # with the GIL released, so no callback thread or queue hop is
+            # needed between capture and recognition.
             with sd.RawInputStream(samplerate=SAMPLE_RATE, blocksize=BLOCK_SIZE, dtype='int16',
-                                   channels=1, callback=self._audio_callback):
+                                   channels=1, latency='low') as stream:
                 print("Listening...", file=sys.stderr)
+                last_partial_raw = ""
+                last_partial_text = ""
                 while self.running:
-                    try:
-                        data = self.audio_queue.get(timeout=1.0)
-                        if rec.AcceptWaveform(data):
-                            result = json.loads(rec.Result())
-                            text = result.get("text", "")
-                            if text:
-                                self.on_text_callback(text, True)
-                        else:
-                            partial = json.loads(rec.PartialResult())
-                            text = partial.get("partial", "")
-                            if text:
-                                self.on_text_callback(text, False)
-                    except queue.Empty:
-                        continue
+                    data, overflowed = stream.read(BLOCK_SIZE)
+                    if overflowed:
+                        print("Input overflow", file=sys.stderr)
+                    rec_buf[:] = data
+                    if rec.AcceptWaveform(rec_data):
+                        result = _json_loads(rec.Result())
+                        text = result.get("text", "")
+                        if text:
+                            self.on_text_callback(text, True)
+                        last_partial_raw = ""
+                        last_partial_text = ""
+                    else:
+                        # Most blocks repeat the previous partial verbatim;
+                        # skip the JSON parse and the Tk marshal for those.
+                        raw = rec.PartialResult()
+                        if raw == last_partial_raw:
+                            continue
+                        last_partial_raw = raw
+                        partial = _json_loads(raw)
+                        text = partial.get("partial", "")
+                        if text and text != last_partial_text:
+                            last_partial_text = text
+                            self.on_text_callback(text, False)
         except Exception as e:
             print(f"Audio stream error: {e}", file=sys.stderr)
             self.on_text_callback(f"Audio Error: {e}", True)
@@ -124,22 +214,46 @@ class SettingsDialog(tk.Toplevel):
         self.title("Settings")
         self.geometry("300x450")
         self.transient(parent)
-        self.grab_set()
 
         # Vars
-        self.font_family = tk.StringVar(value=current_settings.get("font_family", "Helvetica"))
-        self.font_size = tk.IntVar(value=current_settings.get("font_size", 24))
-        self.text_color = current_settings.get("text_color", "#FFFFFF")
-        self.position = tk.StringVar(value=current_settings.get("position", "floating"))
-        self.fullscreen = tk.BooleanVar(value=current_settings.get("fullscreen", False))
+        self.font_family = tk.StringVar()
+        self.font_size = tk.IntVar()
+        self.text_color = "#FFFFFF"
+        self.position = tk.StringVar()
+        self.fullscreen = tk.BooleanVar()
+        self.refresh(current_settings)
 
         self._build_ui()
 
+        # The dialog is reused across opens: closing only hides it, so the
+        # widgets and the font list survive for the next open.
+        self.protocol("WM_DELETE_WINDOW", self.hide)
+
+    def refresh(self, settings: Dict[str, Any]) -> None:
+        """Resets the form fields from the given settings."""
+        self.font_family.set(settings.get("font_family", "Helvetica"))
+        self.font_size.set(settings.get("font_size", 24))
+        self.text_color = settings.get("text_color", "#FFFFFF")
+        self.position.set(settings.get("position", "floating"))
+        self.fullscreen.set(settings.get("fullscreen", False))
+
+    def show(self) -> None:
+        self.deiconify()
+        self.grab_set()
+
+    def hide(self) -> None:
+        self.grab_release()
+        self.withdraw()
+
     def _build_ui(self):
+        global _FONT_FAMILIES_CACHE
+        if _FONT_FAMILIES_CACHE is None:
+            _FONT_FAMILIES_CACHE = tuple(sorted(set(font.families())))
+
         pad_opts = {'pady': 5}
-        
+
         tk.Label(self, text="Font Family:").pack(**pad_opts)
-        ttk.Combobox(self, textvariable=self.font_family, values=font.families(), state="readonly").pack()
+        ttk.Combobox(self, textvariable=self.font_family, values=_FONT_FAMILIES_CACHE, state="readonly").pack()
 
         tk.Label(self, text="Font Size:").pack(**pad_opts)
         tk.Spinbox(self, from_=8, to=150, textvariable=self.font_size).pack()
@@ -154,7 +268,7 @@ class SettingsDialog(tk.Toplevel):
         tk.Checkbutton(self, text="Full Screen", variable=self.fullscreen).pack(pady=10)
 
         tk.Button(self, text="Apply", command=self._apply).pack(side='left', padx=20, pady=20)
-        tk.Button(self, text="Close", command=self.destroy).pack(side='right', padx=20, pady=20)
+        tk.Button(self, text="Close", command=self.hide).pack(side='right', padx=20, pady=20)
 
     def _choose_color(self):
         color = colorchooser.askcolor(title="Choose Text Color", color=self.text_color)[1]
@@ -183,6 +297,14 @@ class CaptionWindow:
         self.root.attributes("-topmost", True)
         self.root.configure(bg='black')
 
+        # Geometry cache: every winfo_* query is a Tcl round-trip, so take
+        # them once here and refresh from <Configure> events instead of
+        # re-querying on every settings apply.
+        self._screen_w = self.root.winfo_screenwidth()
+        self._screen_h = self.root.winfo_screenheight()
+        self._window_w = 800 # Matches the initial geometry; tracked by _on_resize
+        self._wrap_len = self._window_w - 50
+
         # Data State
         self.settings = {
             "font_family": "Helvetica",
@@ -191,14 +313,30 @@ class CaptionWindow:
             "position": "floating",
             "fullscreen": False
         }
-        self.history: List[str] = [""] * MAX_HISTORY # Fixed size buffer
+        # One shared named font for every caption label: changing it is a
+        # single Tcl call that Tk propagates to all widgets using it.
+        self._caption_font = font.Font(
+            root=self.root, name='CaptionFont',
+            family=self.settings["font_family"], size=self.settings["font_size"]
+        )
+
         self.color_cache: List[str] = []
+        self._pending: deque = deque(maxlen=16) # Audio thread -> UI handoff
         
         # UI Component Pools
         self.history_labels: List[tk.Label] = []
         self.partial_label: Optional[tk.Label] = None
         self.content_frame: Optional[tk.Frame] = None
 
+        # Last text/fg pushed to each widget, to skip no-op Tcl config calls.
+        # Both lists rotate together with history_labels.
+        self._label_texts: List[str] = [""] * MAX_HISTORY
+        self._label_colors: List[str] = [""] * MAX_HISTORY
+        self._partial_text = ""
+
+        # Settings dialog is created on first open and reused (hidden) after.
+        self._settings_dialog: Optional[SettingsDialog] = None
+
         self._init_ui()
         self._update_color_cache()
         self._apply_visual_settings()
@@ -210,6 +348,11 @@ class CaptionWindow:
         # Handle Cleanup
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Audio thread signals new captions by generating this virtual
+        # event; no per-update after(0) Tcl command allocation.
+        self.root.bind('<<Caption>>', self._drain_event)
+        self.root.bind('<Configure>', self._on_resize)
+
     def _init_ui(self):
         """Initializes the fixed pool of labels."""
         # Top controls
@@ -226,7 +369,8 @@ class CaptionWindow:
 
         # 1. Partial Result Label (Always at the very bottom)
         self.partial_label = tk.Label(
-            self.content_frame, text="", bg='black', justify='left', anchor='sw'
+            self.content_frame, text="", bg='black', justify='left', anchor='sw',
+            font=self._caption_font
         )
         self.partial_label.pack(side='bottom', anchor='sw', fill='x', pady=(0, 5))
 
@@ -237,7 +381,8 @@ class CaptionWindow:
         # Last packed = Top-most history (Oldest)
         for _ in range(MAX_HISTORY):
             lbl = tk.Label(
-                self.content_frame, text="", bg='black', justify='left', anchor='sw'
+                self.content_frame, text="", bg='black', justify='left', anchor='sw',
+                font=self._caption_font
             )
             lbl.pack(side='bottom', anchor='sw', fill='x')
             self.history_labels.append(lbl)
@@ -262,66 +407,72 @@ class CaptionWindow:
         g = int(base_color[3:5], 16)
         b = int(base_color[5:7], 16)
 
-        for i in range(MAX_HISTORY):
-            # i=0 is newest (Factor 1.0)
-            # i=MAX is oldest
-            factor = 1.0 - (i / (MAX_HISTORY * 1.5))
-            factor = max(0.2, factor)
-            
-            nr = int(r * factor)
-            ng = int(g * factor)
-            nb = int(b * factor)
-            self.color_cache.append(f"#{nr:02x}{ng:02x}{nb:02x}")
+        # i=0 is newest (Factor 1.0), i=MAX is oldest. One vectorized
+        # expression instead of MAX_HISTORY rounds of scalar float math.
+        factors = np.clip(1.0 - np.arange(MAX_HISTORY) / (MAX_HISTORY * 1.5), 0.2, 1.0)
+        rgb = (np.array([r, g, b])[None, :] * factors[:, None]).astype(np.uint8)
+        self.color_cache = [f"#{row[0]:02x}{row[1]:02x}{row[2]:02x}" for row in rgb]
 
     def _apply_visual_settings(self):
         """Updates fonts, geometry, and static properties of pooled labels."""
-        font_spec = (self.settings["font_family"], self.settings["font_size"])
+        # Reconfiguring the shared named font updates every caption label in
+        # one Tcl call; per-label configs below only carry fg/wraplength.
+        self._caption_font.configure(family=self.settings["font_family"],
+                                     size=self.settings["font_size"])
         color = self.settings["text_color"]
-        
-        # Update Partial Label
-        self.partial_label.config(font=font_spec, fg=color)
-
-        # Update History Labels
-        # We map cache index i (0=Newest) to label index i (0=Bottom-most/Newest)
-        for i, lbl in enumerate(self.history_labels):
-            lbl.config(font=font_spec, fg=self.color_cache[i])
 
         # Window Geometry/Fullscreen
         is_fs = self.settings["fullscreen"]
         self.root.attributes("-fullscreen", is_fs)
-        
-        screen_width = self.root.winfo_screenwidth()
+
+        screen_width = self._screen_w
         window_width = screen_width # Default to screen width for now as geometry usually spans width
-        
+
         if not is_fs:
             pos = self.settings["position"]
-            sh = self.root.winfo_screenheight()
-            
+
             if pos == "top":
                 self.root.geometry(f"{screen_width}x250+0+0")
             elif pos == "bottom":
                 taskbar_offset = 40 # Approx
-                self.root.geometry(f"{screen_width}x250+0+{sh - 250 - taskbar_offset}")
+                self.root.geometry(f"{screen_width}x250+0+{self._screen_h - 250 - taskbar_offset}")
             else:
-                # Floating default or keep current - if floating, calculating wrap length is trickier without binding
-                # For now, assume a reasonable max width or update if we were to track geometry
-                window_width = self.root.winfo_width() # Might be 1 if not rendered yet, rely on screen width for safe wrapping or fixed width
-                if window_width <= 1: window_width = 800 # Default init width
-                pass
-        
+                # Floating: use the tracked window width (kept current by
+                # the <Configure> binding).
+                window_width = self._window_w
+
         # Calculate wrap length (window width - padding)
         wrap_len = window_width - 50
-        
-        # Update Partial Label
-        self.partial_label.config(font=font_spec, fg=color, wraplength=wrap_len)
+        self._wrap_len = wrap_len
 
-        # Update History Labels
+        # Single pass over the pooled labels: one configure call per widget.
         # We map cache index i (0=Newest) to label index i (0=Bottom-most/Newest)
+        self.partial_label.configure(fg=color, wraplength=wrap_len)
         for i, lbl in enumerate(self.history_labels):
-            lbl.config(font=font_spec, fg=self.color_cache[i], wraplength=wrap_len)
+            lbl.configure(fg=self.color_cache[i], wraplength=wrap_len)
+            self._label_colors[i] = self.color_cache[i]
+
+    def _on_resize(self, event):
+        """<Configure> handler: refreshes the cached geometry and keeps the
+        label wrap length in step with the actual window width."""
+        if event.widget is not self.root:
+            return
+        self._screen_w = self.root.winfo_screenwidth()
+        self._screen_h = self.root.winfo_screenheight()
+        self._window_w = event.width
+        wrap_len = event.width - 50
+        if wrap_len != self._wrap_len:
+            self._wrap_len = wrap_len
+            self.partial_label.configure(wraplength=wrap_len)
+            for lbl in self.history_labels:
+                lbl.configure(wraplength=wrap_len)
 
     def open_settings(self):
-        SettingsDialog(self.root, self.settings, self.on_settings_changed)
+        if self._settings_dialog is None:
+            self._settings_dialog = SettingsDialog(self.root, self.settings, self.on_settings_changed)
+        else:
+            self._settings_dialog.refresh(self.settings)
+        self._settings_dialog.show()
 
     def on_settings_changed(self, new_settings: Dict[str, Any]):
         self.settings = new_settings
@@ -329,30 +480,62 @@ class CaptionWindow:
         self._apply_visual_settings()
 
     def on_text_update(self, text: str, is_final: bool):
-        """Callback from audio thread. Schedules GUI update on main thread."""
-        self.root.after(0, self._process_text_update, text, is_final)
+        """Callback from audio thread. deque.append is atomic, so no lock;
+        event_generate is safe to call from non-Tk threads."""
+        self._pending.append((text, is_final))
+        try:
+            self.root.event_generate('<<Caption>>', when='tail')
+        except tk.TclError:
+            pass # Window is being torn down
+
+    def _drain_event(self, event=None):
+        """Runs on the main thread per <<Caption>> event. Applies all queued
+        finals in order but only the newest partial -- superseded partials
+        would be overwritten before ever being painted."""
+        latest_partial = None
+        while self._pending:
+            text, is_final = self._pending.popleft()
+            if is_final:
+                self._process_text_update(text, True)
+                latest_partial = None
+            else:
+                latest_partial = text
+        if latest_partial is not None:
+            self._process_text_update(latest_partial, False)
 
     def _process_text_update(self, text: str, is_final: bool):
         """Updates text content of labels. No widget creation/destruction."""
         if is_final:
-            # Shift History
-            # self.history is [Newest, ..., Oldest] conceptually for data?
-            # Actually, let's keep it simple: insert at 0 (Newest)
-            self.history.insert(0, text)
-            if len(self.history) > MAX_HISTORY:
-                self.history.pop() # Remove oldest
-            
-            # Update Pooled Labels
-            # Label 0 is Bottom (Newest) -> maps to history[0]
+            # Rotate the widget ring instead of rewriting every label: the
+            # oldest label takes the new text and is re-packed just above
+            # the partial label, so only one text config (and its reflow)
+            # happens per final.
+            oldest = self.history_labels.pop()
+            if text != self._label_texts.pop():
+                oldest.config(text=text)
+            oldest.pack_forget()
+            anchor = self.history_labels[0] if self.history_labels else self.partial_label
+            oldest.pack(side='bottom', anchor='sw', fill='x', before=anchor)
+            self.history_labels.insert(0, oldest)
+            self._label_texts.insert(0, text)
+            self._label_colors.insert(0, self._label_colors.pop())
+
+            # The fade fg tracks stack position, which every label just
+            # changed; fg-only configs are cheap since they don't reflow.
             for i, lbl in enumerate(self.history_labels):
-                if i < len(self.history):
-                    lbl.config(text=self.history[i])
-                else:
-                    lbl.config(text="")
-            
-            self.partial_label.config(text="")
+                if self.color_cache[i] != self._label_colors[i]:
+                    lbl.config(fg=self.color_cache[i])
+                    self._label_colors[i] = self.color_cache[i]
+
+            self._set_partial_text("")
         else:
+            self._set_partial_text(text)
+
+    def _set_partial_text(self, text: str):
+        """Updates the partial label only if the text actually changed."""
+        if text != self._partial_text:
             self.partial_label.config(text=text)
+            self._partial_text = text
 
     def on_close(self):
         self.transcriber.stop()